@@ -0,0 +1,788 @@
+"""
+bench.py — benchmark สำหรับ backend (API.py)
+รันจากโฟลเดอร์เดียวกับ config.ini:
+
+    python bench.py engine [-n 10]
+    python bench.py pool [--widths 1 4]
+    python bench.py extract [page.html ...]
+    python bench.py http [-n 200]              (server จำลองบนเครื่อง — ไม่ต้องต่อเน็ต)
+    python bench.py irc                        (IRC server จำลองบนเครื่อง — ไม่ต้องต่อเน็ต)
+    python bench.py filter [--patterns 50000]
+    python bench.py replay DIR [--speed 4]     (DIR จาก `python API.py --record DIR`)
+    python bench.py gui [--rate 2000] [--legacy]   (ต้องมีหน้าจอ)
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+
+import API as api
+
+
+def _report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{name:<12} n={len(samples):<4} "
+        f"mean={statistics.mean(samples) * 1000:8.1f}ms  "
+        f"p50={statistics.median(samples) * 1000:8.1f}ms  "
+        f"p95={p95 * 1000:8.1f}ms  "
+        f"min={samples[0] * 1000:8.1f}ms"
+    )
+
+
+# ================== engine: subprocess vs in-process ==================
+def bench_engine(args: argparse.Namespace) -> None:
+    engine = api._get_engine()
+    if engine is None:
+        print("❌ import edge_tts ไม่ได้ — วัดได้แค่ subprocess")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def subprocess_path(text: str) -> bool:
+            return api._run_edge_tts(text, os.path.join(tmp, "out.mp3"))
+
+        paths = {"subprocess": subprocess_path}
+        if engine is not None:
+            paths["in-process"] = engine.synthesize
+
+        for name, fn in paths.items():
+            samples: list[float] = []
+            for i in range(args.n):
+                t0 = time.perf_counter()
+                ok = fn(f"{args.text} {i}")
+                samples.append(time.perf_counter() - t0)
+                if not ok:
+                    print(f"⚠️ {name} #{i} ล้มเหลว")
+            _report(name, samples)
+
+    if engine is not None:
+        engine.close()
+
+
+# ================== pool: sustained msg/s ก่อนเริ่ม drop ==================
+_played = 0
+
+
+def _run_load(
+    width: int, rate: float, args: argparse.Namespace, cache_dir: str
+) -> tuple[int, float, int]:
+    """
+    ป้อนแชท rate msg/s นาน args.duration วินาที
+    คืน (จำนวนที่ถูก drop, msg/s ที่เล่นได้จริง, ข้อความที่ยังไม่ได้เล่นตอนจบ step — ในคิว + กำลังสังเคราะห์)
+    """
+    global _played
+    api.SYNTH_WORKERS = width
+    api.tts_queue = api.ChatScheduler(args.queue, args.policy)
+    api.tts_cache = api.TTSCache(cache_dir, 1 << 30, 100_000)
+    api._stop_event.clear()
+
+    _played = 0
+    worker = threading.Thread(target=api.tts_worker, daemon=True)
+    worker.start()
+
+    drops = 0
+    interval = 1.0 / rate
+    t_end = time.perf_counter() + args.duration
+    next_t = time.perf_counter()
+    i = 0
+    while next_t < t_end:
+        time.sleep(max(0.0, next_t - time.perf_counter()))
+        if not api.tts_queue.put(api.ChatMessage(f"user{i % 7}", f"w{width} r{rate:.2f} #{i}")):
+            drops += 1
+        i += 1
+        next_t += interval
+    played = _played / args.duration
+
+    drops += api.tts_queue.dropped + api.tts_queue.expired
+    backlog = i - _played - drops
+
+    # ไม่ต้องรอเล่นจนหมด — ทิ้ง backlog แล้วปิด worker
+    api._stop_event.set()
+    api.tts_queue.close()
+    worker.join(timeout=args.synth * 4 + 10)
+    return drops, played, backlog
+
+
+def bench_pool(args: argparse.Namespace) -> None:
+    def stub_synthesize(
+        text: str, rate: str = "+0%", timeout: int = 30, out=None, voice=None
+    ) -> bytes:
+        time.sleep(args.synth * random.uniform(0.5, 1.5))
+        data = b"\xff\xf3" + text.encode("utf-8")
+        if out is not None:
+            out.write(data)
+        return data
+
+    class StubSink(api._AudioSink):
+        def play(self, data: bytes) -> None:
+            time.sleep(args.play)
+
+    class CountingPacing(api._PacingController):
+        # delay() ถูกเรียกครั้งเดียวต่อข้อความหลังเล่นครบทุกคลิป — ใช้นับข้อความที่เล่นจบ
+        def delay(self, text: str) -> float:
+            global _played
+            _played += 1
+            return 0.0
+
+    api._synthesize = stub_synthesize
+    api._open_sink = lambda spec: StubSink()
+    api._pacing = CountingPacing()
+    api.log = lambda msg: None
+
+    print(
+        f"stub synth ~{args.synth * 1000:.0f}ms, play {args.play * 1000:.0f}ms, "
+        f"queue {args.queue}, {args.duration:.0f}s ต่อ step"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for width in args.widths:
+            sustained = 0.0
+            rate = args.start
+            while rate <= args.max_rate:
+                drops, played, backlog = _run_load(width, rate, args, tmp)
+                print(
+                    f"  width={width:<3} in {rate:6.2f} msg/s → "
+                    f"played {played:6.2f} msg/s, drop {drops}, ค้าง {backlog}"
+                )
+                # ไม่ drop อย่างเดียวไม่พอ — คิวใหญ่พอก็แค่สะสม backlog ไว้ยังไม่ล้น
+                # ต้องเล่นทันเกือบเท่าที่เข้า หรือค้างไม่เกินที่ pipeline ถือได้ (เผื่อช่วงอุ่นเครื่องข้อความแรก)
+                keeping_up = played >= 0.95 * rate or backlog <= width + api.LOOKAHEAD + 1
+                if drops or not keeping_up:
+                    break
+                sustained = rate
+                rate *= 1.25
+            print(f"width={width:<3} sustained ≈ {sustained:.2f} msg/s ก่อนเล่นไม่ทัน/เริ่ม drop")
+
+
+# ================== http: keep-alive / gzip / reconnect กับ server จำลอง ==================
+def _local_http_server(body: bytes):
+    """
+    http.server บน 127.0.0.1 แบบ HTTP/1.1 keep-alive — gzip เมื่อ client ขอ
+    นับ connection จาก port ฝั่ง client; state["drop"] = True → ตอบแล้วปิด socket เงียบๆ
+    (ไม่ส่ง Connection: close) เหมือน server ตัด keep-alive ที่ว่างนานเกิน
+    """
+    import http.server
+
+    state = {"peers": set(), "gzip": 0, "requests": 0, "drop": False}
+    packed = gzip.compress(body)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # header กับ body เขียนแยกกัน — ไม่งั้นติด delayed ACK ~40ms
+
+        def do_GET(self) -> None:
+            state["requests"] += 1
+            state["peers"].add(self.client_address[1])
+            data = body
+            self.send_response(200)
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                data = packed
+                state["gzip"] += 1
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            if state["drop"]:
+                state["drop"] = False
+                self.close_connection = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def bench_http(args: argparse.Namespace) -> None:
+    import urllib.request
+
+    body = json.dumps({"actions": [{"text": "สวัสดีครับ " * 5, "id": i} for i in range(300)]}).encode("utf-8")
+    server, state = _local_http_server(body)
+    port = server.server_address[1]
+    client = api._HTTPClient("127.0.0.1", port, https=False)
+    failures: list[str] = []
+
+    def check(label: str, ok: bool) -> None:
+        print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+        if not ok:
+            failures.append(label)
+
+    def get() -> bytes:
+        with client.request("GET", "/chat") as resp:
+            return resp.read()
+
+    # reuse + gzip
+    samples = []
+    for _ in range(args.n):
+        t0 = time.perf_counter()
+        data = get()
+        samples.append(time.perf_counter() - t0)
+    print(f"{args.n} request ผ่าน _HTTPClient:")
+    check(f"ใช้ connection เดียว (เปิดไป {len(state['peers'])})", len(state["peers"]) == 1)
+    check(f"server ส่ง gzip ทุกครั้ง ({state['gzip']}/{state['requests']})", state["gzip"] == state["requests"])
+    check("decompress แล้วได้ body เดิม", data == body)
+
+    # server ปิด keep-alive ทิ้ง → request ถัดไปต้อง reconnect เองโดยผู้เรียกไม่เห็น error
+    state["drop"] = True
+    get()
+    time.sleep(0.1)
+    peers = len(state["peers"])
+    try:
+        data = get()
+        retried = data == body
+    except Exception as e:
+        print(f"       {e!r}")
+        retried = False
+    check(f"socket ที่ server ปิดไปแล้ว → ส่งใหม่บน connection ใหม่ ({peers} → {len(state['peers'])})",
+          retried and len(state["peers"]) == peers + 1)
+    client.close()
+
+    # เทียบกับ urlopen ใหม่ทุกครั้ง (ไม่มี keep-alive, ไม่มี gzip)
+    legacy = []
+    for _ in range(args.n):
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/chat", timeout=5) as resp:
+            resp.read()
+        legacy.append(time.perf_counter() - t0)
+    _report("keep-alive", samples)
+    _report("urlopen", legacy)
+    server.shutdown()
+    if failures:
+        raise SystemExit(f"{len(failures)} check ไม่ผ่าน")
+
+
+# ================== irc: Twitch IRC กับ server จำลอง ==================
+class _CapturedTwitch(api.TwitchChatSource):
+    """TwitchChatSource ที่เก็บข้อความไว้ตรวจ — ไม่ผ่าน chat_filter / tts_queue"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.received: list[api.ChatMessage] = []
+
+    def _deliver(self, msg: api.ChatMessage) -> None:
+        self.received.append(msg)
+
+
+def bench_irc(args: argparse.Namespace) -> None:
+    import asyncio
+
+    if not args.verbose:
+        api.log = lambda msg: None
+    failures: list[str] = []
+
+    def check(label: str, ok: bool) -> None:
+        print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+        if not ok:
+            failures.append(label)
+
+    async def scenario() -> None:
+        connected: asyncio.Queue = asyncio.Queue()
+        pong = asyncio.get_running_loop().create_future()
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            await connected.put(time.perf_counter())
+            for _ in range(3):  # CAP REQ / NICK / JOIN
+                await reader.readline()
+            if pong.done():  # connection ที่สอง: แค่ยืนยันว่าต่อเข้ามา
+                writer.write(b":justinfan!j@j.tmi.twitch.tv JOIN #bench\r\n")
+                await writer.drain()
+                await reader.read()
+                return
+            writer.write(
+                b":justinfan!j@j.tmi.twitch.tv JOIN #bench\r\n"
+                b"@badges=subscriber/12;display-name=Sub\\sGuy\\:\\\\s;id=m1 :sub!s@s PRIVMSG #bench :hello\r\n"
+                b"@badges=;bits=100;display-name=Rich;id=m2 :rich!r@r PRIVMSG #bench :\x01ACTION cheers\x01\r\n"
+                b"@badges=;display-name=;id=m3 :plain!p@p PRIVMSG #bench :hi\r\n"
+                b"PING :tmi.twitch.tv\r\n"
+            )
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), 5)
+            pong.set_result(line.decode("utf-8").strip())
+            writer.write(b":tmi.twitch.tv RECONNECT\r\n")
+            await writer.drain()
+            await reader.read()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        source = _CapturedTwitch("bench", "", host="127.0.0.1", port=port, tls=False)
+        client = asyncio.create_task(source.run())
+        try:
+            await asyncio.wait_for(connected.get(), 5)
+            try:
+                reply = await asyncio.wait_for(pong, 5)
+            except asyncio.TimeoutError:
+                reply = ""
+            check(f"ตอบ PING ของ server ({reply or 'ไม่ตอบ'})", reply == "PONG :tmi.twitch.tv")
+            t_reconnect = time.perf_counter()
+            try:
+                waited = await asyncio.wait_for(connected.get(), 5) - t_reconnect
+            except asyncio.TimeoutError:
+                waited = None
+            check(
+                f"RECONNECT → ต่อใหม่ทันทีไม่รอ backoff "
+                f"({'ไม่ต่อใหม่' if waited is None else f'{waited * 1000:.0f}ms'})",
+                waited is not None and waited < api._PollScheduler.ERROR_BASE / 2,
+            )
+        finally:
+            api._stop_event.set()
+            await asyncio.wait_for(client, 5)
+            server.close()
+            await server.wait_closed()
+
+        got = {msg.id: msg for msg in source.received}
+        check(f"ได้ PRIVMSG ครบ ({len(got)}/3)", set(got) == {"m1", "m2", "m3"})
+        if set(got) == {"m1", "m2", "m3"}:
+            check(f"subscriber badge → member ({got['m1'].priority})", got["m1"].priority == api.PRIORITY_MEMBER)
+            check(f"bits → paid ({got['m2'].priority})", got["m2"].priority == api.PRIORITY_PAID)
+            check(f"ไม่มี badge/bits → regular ({got['m3'].priority})", got["m3"].priority == api.PRIORITY_REGULAR)
+            check(f"unescape tag ({got['m1'].author!r})", got["m1"].author == "Sub Guy;\\s")
+            check(f"/me ACTION → ข้อความล้วน ({got['m2'].text!r})", got["m2"].text == "cheers")
+            check(f"display-name ว่าง → nick ({got['m3'].author!r})", got["m3"].author == "plain")
+
+    api._stop_event.clear()
+    print("TwitchChatSource กับ IRC server จำลอง:")
+    asyncio.run(scenario())
+    if failures:
+        raise SystemExit(f"{len(failures)} check ไม่ผ่าน")
+
+
+# ================== extract: ytInitialData regex เดิม vs streaming ==================
+def _legacy_extract(html: str) -> tuple[str | None, str, str]:
+    """วิธีเดิมของ _get_live_chat_config (ก่อนมี _LiveChatPageExtractor) — ใช้เทียบเท่านั้น"""
+    continuation = None
+    m = re.search(r"ytInitialData\s*=\s*(\{.+?\});\s*(?:var |window\[|</script)", html, re.DOTALL)
+    if m:
+        try:
+            data = json.loads(m.group(1))
+            lc = data.get("contents", {}).get("liveChatRenderer", {}).get("continuations", [{}])[0]
+            continuation = (
+                lc.get("invalidationContinuationData", {}).get("continuation")
+                or lc.get("timedContinuationData", {}).get("continuation")
+                or lc.get("reloadContinuationData", {}).get("continuation")
+            )
+        except (json.JSONDecodeError, IndexError, AttributeError):
+            continuation = None
+    if not continuation:
+        for pat in [
+            r'"invalidationContinuationData"\s*:\s*\{"continuation"\s*:\s*"([^"]+)"',
+            r'"timedContinuationData"\s*:\s*\{"timeoutMs"[^}]*"continuation"\s*:\s*"([^"]+)"',
+            r'"reloadContinuationData"\s*:\s*\{"continuation"\s*:\s*"([^"]+)"',
+        ]:
+            cm = re.search(pat, html)
+            if cm:
+                continuation = cm.group(1)
+                break
+    key_m = re.search(r'"INNERTUBE_API_KEY"\s*:\s*"([^"]+)"', html)
+    ver_m = re.search(r'"INNERTUBE_CLIENT_VERSION"\s*:\s*"([^"]+)"', html)
+    return continuation, key_m.group(1) if key_m else "", ver_m.group(1) if ver_m else ""
+
+
+def _synthetic_page() -> bytes:
+    """หน้า live_chat ปลอมขนาดใกล้ของจริง (~1 MB) สำหรับรันแบบไม่มี fixture"""
+    actions = [
+        {"addChatItemAction": {"item": {"liveChatTextMessageRenderer": {
+            "id": f"id{i}", "authorName": {"simpleText": f"user{i}"},
+            "message": {"runs": [{"text": "สวัสดีครับ " * 5}]},
+        }}}}
+        for i in range(400)
+    ]
+    data = {
+        "contents": {"liveChatRenderer": {
+            "continuations": [{"invalidationContinuationData": {"continuation": "SYNTHETIC_TOKEN"}}],
+            "actions": actions,
+        }},
+    }
+    ytcfg = {"INNERTUBE_API_KEY": "SYNTHETIC_KEY", "INNERTUBE_CLIENT_VERSION": "2.0"}
+    filler = "<script>var x = " + json.dumps(["/* js */ " * 20] * 2000) + ";</script>\n"
+    html = (
+        "<html><head>"
+        f"<script>ytcfg.set({json.dumps(ytcfg)});</script>"
+        f"{filler}</head><body>"
+        f"<script>var ytInitialData = {json.dumps(data)};</script>"
+        f"{filler}</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def bench_extract(args: argparse.Namespace) -> None:
+    pages = [(p, open(p, "rb").read()) for p in args.pages] or [("synthetic", _synthetic_page())]
+    for name, raw in pages:
+        def legacy() -> tuple:
+            return _legacy_extract(raw.decode("utf-8", errors="replace"))
+
+        consumed = [len(raw)]
+
+        def streaming() -> tuple:
+            ex = api._LiveChatPageExtractor()
+            for i in range(0, len(raw), args.chunk):
+                if ex.feed(raw[i:i + args.chunk]):
+                    consumed[0] = i + args.chunk
+                    break
+            return ex.result()
+
+        print(f"{os.path.basename(name)} ({len(raw) / 1024:.0f} KB)")
+        for label, fn in (("regex", legacy), ("streaming", streaming)):
+            samples: list[float] = []
+            for _ in range(args.n):
+                t0 = time.perf_counter()
+                out = fn()
+                samples.append(time.perf_counter() - t0)
+            _report(label, samples)
+            print(f"{'':<12} → continuation={str(out[0])[:24]}… key={out[1][:12]}… ver={out[2]}")
+        print(f"{'':<12} streaming อ่านไป {min(consumed[0], len(raw)) / 1024:.0f} KB จาก {len(raw) / 1024:.0f} KB")
+
+
+# ================== filter: blacklist หลายหมื่นคำ + spam filter ==================
+_THAI = [chr(c) for c in range(0x0E01, 0x0E2F)] + ["า", "ี", "ู", "่", "้", "ะ"]
+_LATIN = list("abcdefghijklmnopqrstuvwxyz")
+
+
+def _random_word(rng: random.Random, lo: int, hi: int) -> str:
+    alphabet = _THAI if rng.random() < 0.6 else _LATIN
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(lo, hi)))
+
+
+def bench_filter(args: argparse.Namespace) -> None:
+    import tracemalloc
+
+    rng = random.Random(1)
+    patterns = [_random_word(rng, 5, 12) for _ in range(args.patterns)]
+    messages = []
+    for i in range(args.messages):
+        words = [_random_word(rng, 2, 8) for _ in range(rng.randint(2, 12))]
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(patterns))
+        messages.append(api.ChatMessage(
+            f"user{rng.randrange(args.authors)}", " ".join(words), received=i / args.rate
+        ))
+
+    t0 = time.perf_counter()
+    chat_filter = api.ChatFilter(patterns, 5, 10, 30)
+    build = time.perf_counter() - t0
+    tracemalloc.start()
+    automaton = api._AhoCorasick(patterns)
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"build {len(patterns)} คำ: {build * 1000:.0f}ms, automaton ≈ {mem / 1_048_576:.1f} MB")
+
+    for label, fn in (
+        ("automaton", lambda m: automaton.search(f"{m.author}\n{m.text}")),
+        ("filter", chat_filter.check),
+    ):
+        t0 = time.perf_counter()
+        hits = sum(fn(m) is not None for m in messages)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"{label:<12} {len(messages) / elapsed:10.0f} msg/s  "
+            f"{elapsed / len(messages) * 1e6:6.1f}µs/msg  ข้าม {hits}"
+        )
+
+    # เทียบกับวน `คำ in ข้อความ` ทีละคำ — ช้ามาก ใช้แค่บางส่วน
+    sample = messages[:max(1, args.messages // 100)]
+    t0 = time.perf_counter()
+    for m in sample:
+        text = m.text.casefold()
+        any(p in text for p in automaton.patterns)
+    elapsed = time.perf_counter() - t0
+    print(f"{'naive loop':<12} {len(sample) / elapsed:10.0f} msg/s  {elapsed / len(sample) * 1e6:6.1f}µs/msg")
+
+
+# ================== replay: response ที่อัดไว้ → pipeline ทั้งสาย ==================
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1_048_576 if sys.platform == "darwin" else peak / 1024
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = Counters(cb=ctypes.sizeof(Counters))
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / 1_048_576
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class _ReplaySource(api.ChatSource):
+    """source ของ response ที่อัดไว้ — bench_replay ป้อนข้อความผ่าน _deliver() เองตามเวลา ไม่มี run loop"""
+
+    async def run(self) -> None:
+        return None
+
+
+def bench_replay(args: argparse.Namespace) -> None:
+    with open(os.path.join(args.dir, "responses.jsonl"), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        print("❌ ไม่มี response ใน responses.jsonl")
+        return
+
+    # หน้า bootstrap — วัดเวลา parse อย่างเดียว
+    for name in sorted(os.listdir(args.dir)):
+        if name.startswith("page-") and name.endswith(".html"):
+            raw = open(os.path.join(args.dir, name), "rb").read()
+            t0 = time.perf_counter()
+            ex = api._LiveChatPageExtractor()
+            ex.feed(raw)
+            ok = ex.result()[0] is not None
+            print(f"{name}: parse {(time.perf_counter() - t0) * 1000:.1f}ms ({'ok' if ok else 'ไม่พบ token'})")
+
+    latencies: list[float] = []
+
+    def stub_synthesize(
+        text: str, rate: str = "+0%", timeout: int = 30, out=None, voice=None
+    ) -> bytes:
+        time.sleep(args.synth)
+        data = b"\0" * int(len(text) * args.sec_per_char * api._NullSink.BYTES_PER_SEC)
+        if out is not None:
+            out.write(data)
+        return data
+
+    observe_message = api._observe_message
+
+    def observe_latency(msg: api.ChatMessage, streams: list) -> None:
+        # worker เรียกหลังข้อความเล่นจบ — chat → audio = เวลาเริ่มเล่น - เวลาที่ได้รับ
+        latencies.append(msg.stages["play_start"] - msg.received)
+        observe_message(msg, streams)
+
+    sink = api._NullSink(realtime=True)
+    api._synthesize = stub_synthesize
+    api._open_sink = lambda spec: sink
+    api._observe_message = observe_latency
+    api.tts_cache = api.TTSCache(tempfile.mkdtemp(), 1 << 30, 100_000)
+    if not args.verbose:
+        api.log = lambda msg: None
+
+    worker = threading.Thread(target=api.tts_worker, daemon=True)
+    worker.start()
+
+    sources = {vid: _ReplaySource(vid, api.VOICE) for vid in {r["video_id"] for r in records}}
+    seen = {vid: api._SeenIDs(api.SEEN_IDS) for vid in sources}
+    received = 0
+    delivered: list[api.ChatMessage] = []
+    t_start = time.perf_counter()
+    for rec in records:
+        time.sleep(max(0.0, rec["t"] / args.speed - (time.perf_counter() - t_start)))
+        if rec["status"] >= 400:
+            continue
+        try:
+            messages, _, _ = api._parse_live_chat(json.loads(rec["body"]))
+        except ValueError:
+            continue
+        for msg in messages:
+            if msg.id and not seen[rec["video_id"]].add(msg.id):
+                continue
+            received += 1
+            delivered.append(msg)
+            sources[rec["video_id"]]._deliver(msg)
+
+    def in_flight() -> int:
+        # ออกจาก tts_queue ไปแล้ว (dispatched) แต่ยังเล่นไม่จบ — กำลังสังเคราะห์ / รอใน play queue / กำลังเล่น
+        return sum(1 for m in delivered if "dispatched" in m.stages and "play_end" not in m.stages)
+
+    # รอให้ backlog เล่นจนหมดทั้งสาย (หรือหมดเวลา) — เช็กสองรอบติดกันกันช่วงที่ข้อความเพิ่งหลุดจากคิว
+    deadline = time.perf_counter() + args.drain
+    idle_checks = 0
+    while idle_checks < 2 and time.perf_counter() < deadline:
+        time.sleep(0.1)
+        idle_checks = idle_checks + 1 if api.tts_queue.qsize() == 0 and in_flight() == 0 else 0
+    elapsed = time.perf_counter() - t_start
+    pending = api.tts_queue.qsize() + in_flight()
+    api._stop_event.set()
+    api.tts_queue.close()
+    worker.join(timeout=args.synth * 4 + 10)
+
+    latencies.sort()
+    q = api.tts_queue
+    print(f"replay {len(records)} response ที่ {args.speed:g}x — {elapsed:.1f}s")
+    print(
+        f"  รับ {received} ข้อความ ({received / elapsed:.1f} msg/s), เล่น {len(latencies)} "
+        f"({len(latencies) / elapsed:.1f} msg/s), รวมข้อความ {q.coalesced}"
+    )
+    f = api.chat_filter
+    print(
+        f"  ข้าม: filter {f.blocked + f.duplicates + f.limited}, drop {q.dropped}, "
+        f"หมดอายุ {q.expired}, ยังไม่ได้เล่นตอนหมด --drain {pending}"
+    )
+    if latencies:
+        print(
+            f"  chat → audio  p50={_percentile(latencies, 0.50) * 1000:8.0f}ms  "
+            f"p95={_percentile(latencies, 0.95) * 1000:8.0f}ms  "
+            f"p99={_percentile(latencies, 0.99) * 1000:8.0f}ms"
+        )
+    rss = _peak_rss_mb()
+    print(f"  peak RSS {rss:.1f} MB" if rss is not None else "  peak RSS n/a")
+
+
+# ================== gui: log flood → main loop ค้างนานแค่ไหน ==================
+def _legacy_tick(app) -> None:
+    """วิธีเดิม: แสดงทีละบรรทัด — config/insert/index/see ต่อบรรทัด ไม่จำกัดต่อรอบ"""
+    import main as gui
+
+    try:
+        while True:
+            line = app._log_queue.get_nowait()
+            app._log.config(state="normal")
+            app._log.insert("end", line + "\n", gui._COLOR_TAG.get(gui._tag_color(line), "muted"))
+            lines = int(app._log.index("end-1c").split(".")[0])
+            if lines > 800:
+                app._log.delete("1.0", f"{lines - 800}.0")
+            app._log.see("end")
+            app._log.config(state="disabled")
+    except Exception:
+        pass
+    app._drain_events()
+    app.after(80, _legacy_tick, app)
+
+
+def bench_gui(args: argparse.Namespace) -> None:
+    import main as gui
+
+    app = gui.App()
+    if args.legacy:
+        app._tick = lambda: _legacy_tick(app)
+
+    rng = random.Random(1)
+    icons = ["💬", "💬", "💬", "✅", "⚠️", "⏱️"]
+    lines = [
+        f"[12:00:00] {rng.choice(icons)} user{rng.randrange(500)}: "
+        + " ".join(_random_word(rng, 2, 8) for _ in range(rng.randint(2, 12)))
+        for _ in range(5000)
+    ]
+    stop = threading.Event()
+
+    def flood() -> None:
+        # ส่งเป็นก้อนทุก 5ms เหมือน reader thread ที่อ่าน stdout ทัน
+        i = 0
+        start = time.perf_counter()
+        while not stop.is_set():
+            due = int((time.perf_counter() - start) * args.rate)
+            while i < due:
+                app._log_queue.put(lines[i % len(lines)])
+                app._event_queue.put({"type": "message"})
+                i += 1
+            time.sleep(0.005)
+
+    # heartbeat ทุก 10ms — สายไปเท่าไหร่คือเวลาที่ main loop ค้าง
+    stalls: list[float] = []
+    period = 0.01
+
+    def beat(expected: float) -> None:
+        now = time.perf_counter()
+        stalls.append(max(0.0, now - expected))
+        if not stop.is_set():
+            app.after(int(period * 1000), beat, now + period)
+
+    def finish() -> None:
+        stop.set()
+        app.after(200, app.destroy)
+
+    threading.Thread(target=flood, daemon=True).start()
+    app.after(0, beat, time.perf_counter())
+    app.after(int(args.duration * 1000), finish)
+    t0 = time.perf_counter()
+    app.mainloop()
+    elapsed = time.perf_counter() - t0
+
+    stalls.sort()
+    print(
+        f"{'legacy' if args.legacy else 'batched'}: {args.rate:.0f} บรรทัด/s × {args.duration:.0f}s  "
+        f"heartbeat {len(stalls)} ครั้ง (คาด {elapsed / period:.0f})"
+    )
+    print(
+        f"  main loop ค้าง p50={_percentile(stalls, 0.5) * 1000:.1f}ms  "
+        f"p99={_percentile(stalls, 0.99) * 1000:.1f}ms  max={stalls[-1] * 1000:.1f}ms  "
+        f"ค้าง >100ms รวม {sum(s for s in stalls if s > 0.1):.1f}s"
+    )
+    print(f"  log ค้างในคิวตอนจบ {app._log_queue.qsize()} บรรทัด")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="chat-tts benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("engine", help="latency ต่อข้อความ: subprocess vs in-process edge-tts")
+    p.add_argument("-n", type=int, default=10)
+    p.add_argument("--text", default="ทดสอบเสียง พูดว่า สวัสดีครับ")
+    p.set_defaults(func=bench_engine)
+
+    p = sub.add_parser("pool", help="load test synth pool ด้วย stub engine (ไม่ต้องต่อเน็ต)")
+    p.add_argument("--widths", type=int, nargs="+", default=[1, 4])
+    p.add_argument("--synth", type=float, default=0.4, help="latency เฉลี่ยของ stub (s)")
+    p.add_argument("--play", type=float, default=0.05, help="เวลาเล่นเสียงต่อคลิป (s)")
+    p.add_argument("--queue", type=int, default=10, help="ขนาด tts_queue ระหว่างทดสอบ")
+    p.add_argument("--policy", default="drop-oldest", choices=["drop-oldest", "drop-lowest", "coalesce"])
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--start", type=float, default=1.0)
+    p.add_argument("--max-rate", type=float, default=50.0)
+    p.set_defaults(func=bench_pool)
+
+    p = sub.add_parser("extract", help="parse หน้า live_chat: regex เดิม vs streaming extractor")
+    p.add_argument("pages", nargs="*", help="ไฟล์ html ที่บันทึกไว้ (ไม่ใส่ = ใช้หน้าจำลอง)")
+    p.add_argument("-n", type=int, default=20)
+    p.add_argument("--chunk", type=int, default=64 * 1024)
+    p.set_defaults(func=bench_extract)
+
+    p = sub.add_parser("http", help="_HTTPClient กับ server จำลอง: ใช้ connection ซ้ำ, gzip, reconnect")
+    p.add_argument("-n", type=int, default=200)
+    p.set_defaults(func=bench_http)
+
+    p = sub.add_parser("irc", help="TwitchChatSource กับ IRC server จำลอง: PING/PONG, tags, RECONNECT")
+    p.add_argument("-v", "--verbose", action="store_true", help="แสดง log ของ API.py")
+    p.set_defaults(func=bench_irc)
+
+    p = sub.add_parser("filter", help="blacklist (Aho-Corasick) + rate limit + dedup ต่อข้อความ")
+    p.add_argument("--patterns", type=int, default=50_000)
+    p.add_argument("--messages", type=int, default=100_000)
+    p.add_argument("--authors", type=int, default=2_000)
+    p.add_argument("--rate", type=float, default=500.0, help="msg/s จำลอง (เวลาที่ใช้กับ rate limit)")
+    p.set_defaults(func=bench_filter)
+
+    p = sub.add_parser("replay", help="เล่น response ที่อัดด้วย API.py --record ผ่าน pipeline ทั้งสาย (stub TTS)")
+    p.add_argument("dir")
+    p.add_argument("--speed", type=float, default=1.0, help="เร่งเวลาของ recording (2 = เร็วขึ้นสองเท่า)")
+    p.add_argument("--synth", type=float, default=0.3, help="latency ของ stub synth ต่อคลิป (s)")
+    p.add_argument("--sec-per-char", type=float, default=0.06, help="ความยาวเสียงต่อตัวอักษร (s)")
+    p.add_argument("--drain", type=float, default=60.0, help="รอ backlog เล่นหมดได้นานสุด (s)")
+    p.add_argument("-v", "--verbose", action="store_true", help="แสดง log ของ API.py")
+    p.set_defaults(func=bench_replay)
+
+    p = sub.add_parser("gui", help="ยิง log เข้า GUI รัวๆ แล้ววัดว่า Tk main loop ค้างนานแค่ไหน (ต้องมีหน้าจอ)")
+    p.add_argument("--rate", type=float, default=2000.0, help="บรรทัด log ต่อวินาที")
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--legacy", action="store_true", help="ใช้วิธีเดิม (แสดงทีละบรรทัด) เพื่อเทียบ")
+    p.set_defaults(func=bench_gui)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('config.ini', '.'), ('api.py', '.')],
-    hiddenimports=['edge_tts', 'playsound3'],
+    hiddenimports=['edge_tts', 'playsound3', 'miniaudio'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
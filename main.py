@@ -6,12 +6,16 @@ gui.py — TTS Chat Bridge Dashboard
 
 import os
 import sys
+import json
 import time
+import socket
 import subprocess
 import threading
 import queue
 import configparser
+import itertools
 import tkinter as tk
+from collections import deque
 from tkinter import font as tkfont
 from datetime import datetime
 
@@ -56,6 +60,13 @@ RESTART_DELAY   = 2   # วินาที — รอก่อน restart
 CRASH_THRESHOLD = 5   # crash กี่ครั้งใน window ถึง backoff
 CRASH_WINDOW    = 60  # วินาที — นับ crash ย้อนหลังกี่วินาที
 BACKOFF_DELAY   = 30  # วินาที — รอนานขึ้นเมื่อ crash ถี่
+WARM_STANDBY    = True  # เปิด backend สำรองไว้ล่วงหน้า (import เสร็จแล้ว รอ "go") — crash แล้วสลับได้ทันที
+
+# ─────────────────────────── log view ─────────────────────────
+TICK_MS      = 80      # รอบอัปเดต UI (log + ตัวเลข) — ทุกอย่างรวมเป็นครั้งเดียวต่อรอบ
+LOG_HISTORY  = 20000   # บรรทัดที่เก็บไว้ทั้งหมด (ring buffer ในหน่วยความจำ)
+LOG_VISIBLE  = 500     # บรรทัดที่อยู่ใน Text widget จริงตอนดูท้ายสุด
+LOG_PAGE     = 200     # เลื่อนขึ้นจนสุด → ดึงบรรทัดเก่าจาก history มาเติมทีละกี่บรรทัด
 
 # ─────────────────────────── palette ──────────────────────────
 BG        = "#0f1117"
@@ -93,6 +104,103 @@ def _tag_color(line: str) -> str:
             return color
     return TEXT2
 
+_COLOR_TAG = {
+    GREEN:  "green",
+    BLUE:   "blue",
+    YELLOW: "yellow",
+    RED:    "red",
+    MUTED:  "muted",
+    TEXT:   "white",
+}
+
+
+class _LogView:
+    """
+    log ทั้งหมดอยู่ใน ring buffer (LOG_HISTORY บรรทัด) — Text widget ถือแค่ช่วงที่กำลังดู
+    - add() แค่ต่อท้าย buffer; flush() วาดบรรทัดใหม่ด้วย insert เดียวต่อรอบ
+      ไม่ว่าจะเข้ามากี่พันบรรทัด widget ถูกแตะไม่เกิน LOG_VISIBLE บรรทัด
+    - สีคำนวณตอนวาดเท่านั้น — บรรทัดที่ถูกดันตกไปก่อนได้แสดงไม่เสียเวลาเลย
+    - เลื่อนขึ้นไปอ่านอยู่ → ไม่แตะ widget (ข้อความไม่กระโดด) กลับมาท้ายสุดค่อยวาดต่อ
+    - เลื่อนขึ้นจนสุด → ดึงบรรทัดเก่ามาเติมด้านบนทีละ LOG_PAGE
+    ตำแหน่งบรรทัดนับแบบ absolute (บรรทัดที่เคยเข้ามาทั้งหมด) — widget ถือช่วง [_lo, _hi)
+    """
+
+    def __init__(self, text: tk.Text, scrollbar: tk.Scrollbar) -> None:
+        self._text = text
+        self._scrollbar = scrollbar
+        self._history: deque[tuple[str, str | None]] = deque(maxlen=LOG_HISTORY)
+        self._total = 0
+        self._lo = 0
+        self._hi = 0
+        self._follow = True
+        self._paging = False
+        text.config(yscrollcommand=self._on_scroll)
+
+    @property
+    def _oldest(self) -> int:
+        return self._total - len(self._history)
+
+    def add(self, lines: list[str], tag: str | None = None) -> None:
+        self._history.extend((line, tag) for line in lines)
+        self._total += len(lines)
+
+    def _chunks(self, start: int, stop: int) -> list[str]:
+        args: list[str] = []
+        for line, tag in itertools.islice(self._history, start - self._oldest, stop - self._oldest):
+            args += [line + "\n", tag or _COLOR_TAG.get(_tag_color(line), "muted")]
+        return args
+
+    def flush(self) -> None:
+        if not self._follow or self._hi == self._total:
+            return
+        text = self._text
+        text.config(state="normal")
+        start = max(self._hi, self._oldest, self._total - LOG_VISIBLE)
+        if start > self._hi:
+            # ตกไปเกิน 1 หน้าจอ (หรือหลุดจาก history แล้ว) — วาดช่วงท้ายใหม่ทั้งหมดถูกกว่าตัดทีละส่วน
+            text.delete("1.0", "end")
+            self._lo = start
+        text.insert("end", *self._chunks(start, self._total))
+        self._hi = self._total
+        excess = (self._hi - self._lo) - LOG_VISIBLE
+        if excess > 0:
+            text.delete("1.0", f"{excess + 1}.0")
+            self._lo += excess
+        text.see("end")
+        text.config(state="disabled")
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        self._scrollbar.set(first, last)
+        self._follow = float(last) >= 0.999
+        if not self._follow and float(first) <= 0.0 and self._lo > self._oldest and not self._paging:
+            self._paging = True
+            self._text.after_idle(self._load_older)
+
+    def _load_older(self) -> None:
+        self._paging = False
+        start = max(self._oldest, self._lo - LOG_PAGE)
+        if start >= self._lo:
+            return
+        text = self._text
+        n = self._lo - start
+        text.config(state="normal")
+        text.insert("1.0", *self._chunks(start, self._lo))
+        self._lo = start
+        excess = (self._hi - self._lo) - 2 * LOG_VISIBLE
+        if excess > 0:
+            # ตัดด้านล่างแทน — widget ไม่โตเกิน 2 หน้าจอ; กลับไปท้ายสุดแล้ว flush() เติมคืนเอง
+            text.delete(f"{self._hi - self._lo - excess + 1}.0", "end")
+            self._hi -= excess
+        text.config(state="disabled")
+        text.yview(f"{n + 1}.0")
+
+    def clear(self) -> None:
+        self._history.clear()
+        self._lo = self._hi = self._total
+        self._text.config(state="normal")
+        self._text.delete("1.0", "end")
+        self._text.config(state="disabled")
+
 
 # ══════════════════════════════════════════════════════════════
 class App(tk.Tk):
@@ -106,8 +214,11 @@ class App(tk.Tk):
 
         # process handle
         self._proc: subprocess.Popen | None = None
+        self._standby: subprocess.Popen | None = None
         self._running = False
+        self._stop_signal = threading.Event()   # ปลุก watcher ที่รอ backoff อยู่
         self._log_queue: queue.Queue[str] = queue.Queue()
+        self._event_queue: queue.Queue[dict] = queue.Queue()
         self._msg_count = 0
         self._restart_count = 0
         self._crash_times: list[float] = []   # monotonic timestamps
@@ -115,7 +226,8 @@ class App(tk.Tk):
 
         self._build_fonts()
         self._build_ui()
-        self._poll_logs()
+        self._start_event_server()
+        self._tick()
 
         self.protocol("WM_DELETE_WINDOW", self._on_close)
 
@@ -153,11 +265,13 @@ class App(tk.Tk):
         stats = tk.Frame(self, bg=BG2, pady=10)
         stats.pack(fill="x", padx=16, pady=(0, 8))
         self._stat_frames = {}
-        for col, (key, label, val) in enumerate([
+        stat_cols = [
             ("msgs",     "Messages", "0"),
+            ("queue",    "Queue",    "0"),
             ("restarts", "Restarts", "0"),
             ("status",   "Status",   "idle"),
-        ]):
+        ]
+        for col, (key, label, val) in enumerate(stat_cols):
             f = tk.Frame(stats, bg=BG2)
             f.pack(side="left", expand=True, fill="x")
             vv = tk.StringVar(value=val)
@@ -167,7 +281,7 @@ class App(tk.Tk):
                      font=self.fn_small).pack()
             self._stat_frames[key] = vv
             # divider
-            if col < 2:
+            if col < len(stat_cols) - 1:
                 tk.Frame(stats, bg=BORDER, width=1).pack(side="left", fill="y", pady=6)
 
         # ── config panel ──
@@ -222,12 +336,12 @@ class App(tk.Tk):
             bg=BG2, fg=TEXT2, insertbackground=TEXT,
             relief="flat", font=self.fn_mono,
             wrap="word", state="disabled",
-            yscrollcommand=scrollbar.set,
             padx=10, pady=8,
             spacing1=1, spacing3=2,
         )
         self._log.pack(fill="both", expand=True)
         scrollbar.config(command=self._log.yview)
+        self._log_view = _LogView(self._log, scrollbar)
 
         # text color tags
         for name, color in [
@@ -289,6 +403,7 @@ class App(tk.Tk):
         self._crash_times = []
         self._start_time = time.time()
         self._running = True
+        self._stop_signal.clear()
 
         self._stat_frames["status"].set("live")
         self._status_dot.config(fg=GREEN)
@@ -308,7 +423,11 @@ class App(tk.Tk):
         if not self._running:
             return
         self._running = False
-        # watcher loop จะ terminate proc เองเมื่อเห็น _running=False
+        self._stop_signal.set()
+        # watcher block อยู่ที่ proc.wait() — terminate ตรงนี้ให้มันตื่นแล้วเก็บกวาดเอง
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
         self._set_stopped()
         self._append_log("[gui] 🛑 หยุดแล้ว", RED)
 
@@ -322,16 +441,21 @@ class App(tk.Tk):
         self._uptime_var.set("")
 
     # ──────────────── subprocess helpers ─────────────────────
-    def _spawn_proc(self) -> subprocess.Popen:
+    def _spawn_proc(self, standby: bool = False) -> subprocess.Popen:
         if getattr(sys, "frozen", False):
             # 🔥 exe mode → เรียกตัวเอง + flag
             cmd = [sys.executable, "--api", "--silent"]
         else:
             # 🧪 dev mode → เรียก api.py ตรง
             cmd = [sys.executable, "-u", MAIN_TARGET, "--silent"]
+        if self._event_port:
+            cmd += ["--events-port", str(self._event_port)]
+        if standby:
+            cmd.append("--standby")
 
         proc = subprocess.Popen(
             cmd,
+            stdin=subprocess.PIPE if standby else subprocess.DEVNULL,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             text=True,
@@ -350,19 +474,43 @@ class App(tk.Tk):
 
         return proc
 
+    def _promote_standby(self) -> subprocess.Popen | None:
+        """ส่ง "go" ให้ตัวสำรองที่ยังมีชีวิต — None ถ้าไม่มี/ตายไปแล้ว (ต้อง cold start)"""
+        standby, self._standby = self._standby, None
+        if standby is None:
+            return None
+        if standby.poll() is None:
+            try:
+                standby.stdin.write("go\n")
+                standby.stdin.flush()
+                return standby
+            except OSError:
+                pass
+        self._stop_proc(standby)
+        return None
+
+    @staticmethod
+    def _stop_proc(proc: subprocess.Popen | None):
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
     def _watcher_loop(self):
         """
         Watcher รัน main.py และ auto-restart พร้อม crash backoff
-        ทำงานใน daemon thread — ควบคุมด้วย self._running
+        ทำงานใน daemon thread — block ที่ proc.wait() รู้ทันทีที่ process จบ ควบคุมด้วย self._running
+        WARM_STANDBY: มีตัวสำรองที่ import เสร็จแล้วรออยู่เสมอ — crash แล้วส่ง "go" ไม่ต้องรอ RESTART_DELAY
         """
         self._proc = self._spawn_proc()
+        if WARM_STANDBY:
+            self._standby = self._spawn_proc(standby=True)
 
         while self._running:
-            time.sleep(1)
-            code = self._proc.poll()
-
-            if code is None:
-                continue  # ยังรันอยู่
+            code = self._proc.wait()
 
             if not self._running:
                 break  # user กด Stop
@@ -379,19 +527,14 @@ class App(tk.Tk):
             self._crash_times = [t for t in self._crash_times if now - t < CRASH_WINDOW]
             self._crash_times.append(now)
 
-            if len(self._crash_times) >= CRASH_THRESHOLD:
+            backoff = len(self._crash_times) >= CRASH_THRESHOLD
+            if backoff:
                 self._log_queue.put(
                     f"[watcher] 🔴 crash {len(self._crash_times)} ครั้งใน {CRASH_WINDOW}s "
                     f"— backoff {BACKOFF_DELAY}s..."
                 )
-                # sleep in small chunks เพื่อตอบสนอง _running flag
-                for _ in range(BACKOFF_DELAY):
-                    if not self._running:
-                        break
-                    time.sleep(1)
+                self._stop_signal.wait(BACKOFF_DELAY)
                 self._crash_times.clear()
-            else:
-                time.sleep(RESTART_DELAY)
 
             if not self._running:
                 break
@@ -400,67 +543,129 @@ class App(tk.Tk):
             self.after(0, lambda: self._stat_frames["restarts"].set(
                 str(self._restart_count)
             ))
-            self._log_queue.put(f"[watcher] 🔄 restart #{self._restart_count}...")
-            self._proc = self._spawn_proc()
+            proc = self._promote_standby()
+            if proc is not None:
+                self._log_queue.put(f"[watcher] ⚡ restart #{self._restart_count} — สลับไปตัวสำรอง")
+            else:
+                if not backoff:
+                    self._stop_signal.wait(RESTART_DELAY)
+                    if not self._running:
+                        break
+                self._log_queue.put(f"[watcher] 🔄 restart #{self._restart_count}...")
+                proc = self._spawn_proc()
+            self._proc = proc
+            if WARM_STANDBY:
+                self._standby = self._spawn_proc(standby=True)
 
         # cleanup เมื่อ loop จบ
-        if self._proc and self._proc.poll() is None:
-            self._proc.terminate()
-            try:
-                self._proc.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self._proc.kill()
+        self._stop_proc(self._proc)
+        self._stop_proc(self._standby)
+        self._standby = None
 
     def _read_proc(self, proc: subprocess.Popen):
-        """อ่าน stdout บรรทัดต่อบรรทัดแล้วยัดใส่ queue"""
+        """อ่าน stdout บรรทัดต่อบรรทัดแล้วยัดใส่ queue (log ให้คนอ่านเท่านั้น — ตัวเลขมาจาก event)"""
         try:
             for line in proc.stdout:
                 line = line.rstrip("\n")
                 if line:
                     self._log_queue.put(line)
-                    # นับ messages จาก 💬
-                    if "💬" in line:
-                        self._msg_count += 1
-                        self.after(0, lambda: self._stat_frames["msgs"].set(
-                            str(self._msg_count)
-                        ))
         except Exception:
             pass
 
-    # ──────────────── log poller ──────────────────────────────
-    def _poll_logs(self):
+    # ──────────────── event channel (backend → GUI) ──────────
+    def _start_event_server(self):
+        """
+        เปิด TCP บน localhost (port สุ่ม) รอ backend ต่อเข้ามาส่ง event แบบ JSON lines
+        backend ทุกตัวที่ spawn (รวมหลัง restart) ได้ port นี้ผ่าน --events-port
+        """
+        self._event_port = 0
+        try:
+            srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            srv.bind(("127.0.0.1", 0))
+            srv.listen(4)
+        except OSError as e:
+            self._append_log(f"[gui] ⚠️ เปิด event port ไม่ได้ — ตัวเลขจะไม่อัปเดต: {e}", YELLOW)
+            return
+        self._event_port = srv.getsockname()[1]
+        threading.Thread(
+            target=self._accept_events, args=(srv,), daemon=True, name="events-accept",
+        ).start()
+
+    def _accept_events(self, srv: socket.socket):
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self._read_events, args=(conn,), daemon=True, name="events-reader",
+            ).start()
+
+    def _read_events(self, conn: socket.socket):
+        with conn, conn.makefile("r", encoding="utf-8", errors="replace") as f:
+            try:
+                for line in f:
+                    try:
+                        self._event_queue.put(json.loads(line))
+                    except ValueError:
+                        continue
+            except OSError:
+                pass
+
+    def _drain_events(self):
+        """ตัวเลขจาก event ที่ค้างทั้งหมดในรอบนี้ — ไม่ว่าจะมากี่ร้อย event ก็ set ครั้งเดียว"""
+        new_msgs = 0
+        stats = None
+        states: dict[str, str] = {}
         try:
             while True:
-                line = self._log_queue.get_nowait()
-                self._append_log(line)
+                evt = self._event_queue.get_nowait()
+                kind = evt.get("type")
+                if kind == "message":
+                    new_msgs += 1
+                elif kind == "stats":
+                    stats = evt
+                elif kind == "state":
+                    states[evt.get("source", "")] = evt.get("state", "")
+        except queue.Empty:
+            pass
+
+        if new_msgs:
+            self._msg_count += new_msgs
+            self._stat_frames["msgs"].set(str(self._msg_count))
+        if stats is not None:
+            self._stat_frames["queue"].set(str(stats.get("queue", 0)))
+        if states and self._running:
+            if "reconnecting" in states.values():
+                self._stat_frames["status"].set("reconnect")
+                self._status_dot.config(fg=YELLOW)
+            elif "connected" in states.values():
+                self._stat_frames["status"].set("live")
+                self._status_dot.config(fg=GREEN)
+
+    # ──────────────── UI tick ─────────────────────────────────
+    def _tick(self):
+        """รอบเดียวของ UI: ย้าย log ที่ค้างเข้า history, วาดครั้งเดียว, อัปเดตตัวเลขครั้งเดียว"""
+        lines: list[str] = []
+        try:
+            # เกิน LOG_HISTORY ก็ถูก ring buffer ดันทิ้งอยู่ดี — ที่เหลือค่อยรอบหน้า
+            for _ in range(LOG_HISTORY):
+                lines.append(self._log_queue.get_nowait())
         except queue.Empty:
             pass
-        self.after(80, self._poll_logs)
+        if lines:
+            self._log_view.add(lines)
+        self._log_view.flush()
+        self._drain_events()
+        self.after(TICK_MS, self._tick)
 
     def _append_log(self, line: str, force_color: str | None = None):
         color = force_color or _tag_color(line)
-        tag = {
-            GREEN:  "green",
-            BLUE:   "blue",
-            YELLOW: "yellow",
-            RED:    "red",
-            MUTED:  "muted",
-            TEXT:   "white",
-        }.get(color, "muted")
-
-        self._log.config(state="normal")
-        self._log.insert("end", line + "\n", tag)
-        # keep max 800 lines
-        lines = int(self._log.index("end-1c").split(".")[0])
-        if lines > 800:
-            self._log.delete("1.0", f"{lines - 800}.0")
-        self._log.see("end")
-        self._log.config(state="disabled")
+        self._log_view.add([line], _COLOR_TAG.get(color, "muted"))
+        self._log_view.flush()
 
     def _clear_log(self):
-        self._log.config(state="normal")
-        self._log.delete("1.0", "end")
-        self._log.config(state="disabled")
+        self._log_view.clear()
 
     # ──────────────── uptime tick ─────────────────────────────
     def _tick_uptime(self):